@@ -2,18 +2,25 @@
 from abc import ABC, abstractmethod
 from logging import Logger, getLogger
 from getpass import getpass
+from typing import BinaryIO, List
 
 
 class BackupFolder:
+    __slots__ = ('name', 'path', 'id')
     name: str
     path: str
     id: str
 
 class BackupFile(BackupFolder):
+    __slots__ = ('parent_dir',)
     parent_dir: BackupFolder
 
 
 class BackupBackend(ABC):
+    """Base class for cloud backends. Methods taking already retrieved folder
+    (like get_file_in_folder) fall back to their path based counterparts, backends
+    can override them to skip resolving folder by its path again.
+    """
 
     def __init__(
         self,
@@ -64,6 +71,18 @@ class BackupBackend(ABC):
         """
         raise Exception('Not implemented exception')
 
+    def get_file_in_folder(self, folder: BackupFolder, file_name: str) -> BackupFile:
+        """Finds and returns file by its name in already retrieved folder.
+
+        Args:
+            folder (BackupFolder): folder containing file
+            file_name (str): file name
+
+        Returns:
+            BackupFile: file or None if it does not exist
+        """
+        return self.get_file_by_path(f'{folder.path}/{file_name}')
+
     @abstractmethod
     def create_folder_if_not_exists(self, path: str) -> BackupFolder:
         """Creates folder with given path, do nothing if folder already exists
@@ -89,6 +108,35 @@ class BackupBackend(ABC):
         """
         raise Exception('Not implemented exception')
 
+    @abstractmethod
+    def upload_stream(self, fileobj: BinaryIO, name: str, directory_path: str) -> BackupFile:
+        """Uploads content of seekable binary file object to cloud directory,
+        without need to store it as a local file first.
+
+        Args:
+            fileobj (BinaryIO): file object to read uploaded content from
+            name (str): name of the file created in cloud
+            directory_path (str): path to directory in cloud where file should be uploaded
+
+        Returns:
+            BackupFile: uploaded file object
+        """
+        raise Exception('Not implemented exception')
+
+    def upload_stream_to_folder(self, fileobj: BinaryIO, name: str, folder: BackupFolder) -> BackupFile:
+        """Uploads content of seekable binary file object to already retrieved
+        cloud folder.
+
+        Args:
+            fileobj (BinaryIO): file object to read uploaded content from
+            name (str): name of the file created in cloud
+            folder (BackupFolder): cloud folder where file should be uploaded
+
+        Returns:
+            BackupFile: uploaded file object
+        """
+        return self.upload_stream(fileobj, name, folder.path)
+
     @abstractmethod
     def rename_file(self, file: BackupFile, new_name: str) -> None:
         """Renames file.
@@ -108,6 +156,16 @@ class BackupBackend(ABC):
         """
         raise Exception('Not implemented exception')
 
+    def remove_files(self, files: List[BackupFile]) -> None:
+        """Removes many files (not reversable) from cloud directories. Backends
+        can override it to remove them all in a single request.
+
+        Args:
+            files (List[BackupFile]): files to remove
+        """
+        for file in files:
+            self.remove_file(file)
+
     @abstractmethod
     def download_file(self, file: BackupFile, output_path: str) -> None:
         """Download file from backend
@@ -3,6 +3,7 @@ import os
 import sys
 import importlib
 import logging
+from functools import lru_cache
 from .manager import BackupManager, BackupConfiguration
 
 
@@ -11,6 +12,12 @@ def read_configuration() -> BackupConfiguration:
     if not os.path.exists(config_file_path):
         raise Exception(
             'Backup configuration file does not exist. It shoud be named ".backup.config.py" and placed in current working directory')
+    # configuration module is executed again only if file was modified since last read
+    return _load_configuration(os.path.abspath(config_file_path), os.path.getmtime(config_file_path))
+
+
+@lru_cache(maxsize=1)
+def _load_configuration(config_file_path: str, config_file_mtime: float) -> BackupConfiguration:
     spec = importlib.util.spec_from_file_location(
         "backup_config", config_file_path)
     backup_config = importlib.util.module_from_spec(spec)
@@ -52,8 +59,9 @@ def backup(ctx: CLIContext):
 
 
 @cli.command()
+@click.option('--path', 'paths', type=str, multiple=True, help='Backed up path to restore (as specified in configuration). Can be used multiple times. All paths are restored by default.')
 @click.pass_obj
-def restore(ctx: CLIContext):
+def restore(ctx: CLIContext, paths: tuple):
     """Restores files from backup"""
     logger = logging.getLogger('Restore')
     manager = BackupManager(config=read_configuration())
@@ -63,14 +71,14 @@ def restore(ctx: CLIContext):
         manager.logger.setLevel(logging.ERROR)
         manager.backend.logger.setLevel(logging.ERROR)
     try:
-        manager.restore()
+        manager.restore(list(paths) if len(paths) > 0 else None)
     except Exception:
         logger.error(click.style(
             f'''Failed to restore file from cloud backup. Whats now?
             
             Go to you cloud provider (depending on used backend) and check if path "{manager.config.root_cloud_dir}" exist in your backup cloud.
 
-                Yes: Download file backup.zip from that location and restore manually from it.
+                Yes: Download file backup.tar.zst (or backup.zip made by older versions) from that location and restore manually from it.
                 No: Everything is lost, no hope is left
             ''',
             fg='red'))
\ No newline at end of file
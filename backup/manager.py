@@ -1,13 +1,235 @@
+import io
 import json
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+import tarfile
 from datetime import datetime, timezone
 from logging import Logger
 import os
+import stat
 import click
 import shutil
-from typing import Dict, List, TypedDict
+import tempfile
+import zstandard
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import BinaryIO, Dict, Iterator, List, Set, Tuple, TypedDict
 from zipfile import ZipFile
 from .backend import *
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from blake3 import blake3 as _new_file_hash
+except ImportError:
+    from hashlib import blake2b as _new_file_hash
+
+try:
+    import libarchive
+except (ImportError, OSError, AttributeError):
+    # python package may be installed without native libarchive library
+    libarchive = None
+
+
+def _json_dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+
+def _json_loads(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# zstd level 3 is its default - much faster than DEFLATE at similar ratio
+ZSTD_COMPRESSION_LEVEL: int = 3
+HASH_CHUNK_SIZE: int = 1024 * 1024
+# archives smaller than that never touch the disk before upload
+ARCHIVE_SPOOL_MAX_SIZE: int = 64 * 1024 * 1024
+LIBARCHIVE_BLOCK_SIZE: int = 64 * 1024
+
+
+class _HashingReader:
+    """Wraps file object and updates hash with every chunk read from it
+    """
+
+    def __init__(self, file: io.BufferedReader, file_hash) -> None:
+        self._file: io.BufferedReader = file
+        self._file_hash = file_hash
+
+    def read(self, size: int = -1) -> bytes:
+        data: bytes = self._file.read(size)
+        self._file_hash.update(data)
+        return data
+
+
+def _hash_file(file_path: str) -> str:
+    file_hash = _new_file_hash()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def _read_file_chunks(file_path: str, file_hash=None) -> Iterator[bytes]:
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            if file_hash is not None:
+                # compute hash while file is read anyway
+                file_hash.update(chunk)
+            yield chunk
+
+
+class _ArchiveWriter(ABC):
+    """Writes entries of tar archive stream
+    """
+
+    @abstractmethod
+    def add_bytes(self, arcname: str, data: bytes, mtime: int) -> None:
+        raise Exception('Not implemented exception')
+
+    @abstractmethod
+    def add_directory(self, arcname: str, dir_stat: os.stat_result) -> None:
+        raise Exception('Not implemented exception')
+
+    @abstractmethod
+    def add_file(
+        self,
+        file_path: str,
+        arcname: str,
+        file_stat: os.stat_result,
+        file_hash=None
+    ) -> None:
+        """Adds file content to archive.
+
+        Args:
+            file_path (str): path to file
+            arcname (str): name of file in archive
+            file_stat (os.stat_result): file stat, entry header is built from it
+            file_hash (optional): hash object updated with file content. Defaults to None.
+        """
+        raise Exception('Not implemented exception')
+
+
+class _TarfileArchiveWriter(_ArchiveWriter):
+
+    def __init__(self, tar: tarfile.TarFile) -> None:
+        self._tar: tarfile.TarFile = tar
+
+    def add_bytes(self, arcname: str, data: bytes, mtime: int) -> None:
+        file_info = tarfile.TarInfo(arcname)
+        file_info.size = len(data)
+        file_info.mtime = mtime
+        self._tar.addfile(file_info, io.BytesIO(data))
+
+    def add_directory(self, arcname: str, dir_stat: os.stat_result) -> None:
+        dir_info = tarfile.TarInfo(arcname)
+        dir_info.type = tarfile.DIRTYPE
+        dir_info.mtime = int(dir_stat.st_mtime)
+        dir_info.mode = stat.S_IMODE(dir_stat.st_mode)
+        self._tar.addfile(dir_info)
+
+    def add_file(
+        self,
+        file_path: str,
+        arcname: str,
+        file_stat: os.stat_result,
+        file_hash=None
+    ) -> None:
+        file_info = tarfile.TarInfo(arcname)
+        file_info.size = file_stat.st_size
+        file_info.mtime = int(file_stat.st_mtime)
+        file_info.mode = stat.S_IMODE(file_stat.st_mode)
+        with open(file_path, 'rb') as file:
+            if file_hash is not None:
+                # compute hash while file is read anyway
+                file = _HashingReader(file, file_hash)
+            self._tar.addfile(file_info, file)
+
+
+class _LibarchiveArchiveWriter(_ArchiveWriter):
+    """Builds entries headers in C using libarchive, much cheaper than
+    tarfile for trees with many small files
+    """
+
+    def __init__(self, archive) -> None:
+        self._archive = archive
+
+    def add_bytes(self, arcname: str, data: bytes, mtime: int) -> None:
+        self._archive.add_file_from_memory(
+            arcname, len(data), data, permission=0o644, mtime=mtime)
+
+    def add_directory(self, arcname: str, dir_stat: os.stat_result) -> None:
+        self._archive.add_file_from_memory(
+            arcname, 0, b'',
+            filetype=libarchive.entry.FileType.DIRECTORY,
+            permission=stat.S_IMODE(dir_stat.st_mode),
+            mtime=int(dir_stat.st_mtime)
+        )
+
+    def add_file(
+        self,
+        file_path: str,
+        arcname: str,
+        file_stat: os.stat_result,
+        file_hash=None
+    ) -> None:
+        self._archive.add_file_from_memory(
+            arcname, file_stat.st_size, _read_file_chunks(
+                file_path, file_hash),
+            permission=stat.S_IMODE(file_stat.st_mode),
+            mtime=int(file_stat.st_mtime)
+        )
+
+
+@contextmanager
+def _open_archive_writer(fileobj: BinaryIO) -> Iterator[_ArchiveWriter]:
+    """Opens tar stream writer, using libarchive if it is available. Both write
+    pax tar archives, so restore does not care which one was used.
+    """
+    if libarchive is None:
+        with tarfile.open(fileobj=fileobj, mode='w|') as tar:
+            yield _TarfileArchiveWriter(tar)
+        return
+
+    def write(data) -> int:
+        fileobj.write(data)
+        return len(data)
+    with libarchive.custom_writer(write, 'pax_restricted', block_size=LIBARCHIVE_BLOCK_SIZE) as archive:
+        yield _LibarchiveArchiveWriter(archive)
+
+
+def _scan_directory(dir_path: str, arcname: str, dir_stat: os.stat_result) -> Iterator[Tuple[str, str, os.stat_result]]:
+    """Yields directory and all its content as (path, arcname, stat) tuples. Tree is
+    walked with os.scandir so entries types come from directory listing (no extra
+    isdir call per entry as tar.add would do). DirEntry.stat() still makes one stat
+    call per entry on POSIX, its result is reused for tar headers.
+    """
+    dirs_to_scan: List[Tuple[str, str, os.stat_result]] = [
+        (dir_path, arcname, dir_stat)]
+    while len(dirs_to_scan) > 0:
+        dir_path, arcname, dir_stat = dirs_to_scan.pop()
+        yield dir_path, arcname, dir_stat
+        with os.scandir(dir_path) as dir_iterator:
+            entries: List[os.DirEntry] = sorted(
+                dir_iterator, key=lambda entry: entry.name)
+        subdirs: List[Tuple[str, str, os.stat_result]] = []
+        for entry in entries:
+            entry_arcname: str = f'{arcname}/{entry.name}'
+            # symlinks to directories are skipped, symlinks to files are stored
+            # as regular files
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(
+                    (entry.path, entry_arcname, entry.stat(follow_symlinks=False)))
+            elif entry.is_file():
+                yield entry.path, entry_arcname, entry.stat()
+        # reversed so subdirectories are popped in alphabetical order
+        dirs_to_scan.extend(reversed(subdirs))
+
 
 class BackupConfiguration:
     """Class for configuring backups
@@ -20,6 +242,7 @@ class BackupConfiguration:
         paths_to_backup: List[str],
         tmp_dir_path: str = './tmp',
         root_dir: str = os.curdir,
+        max_incremental_backups: int = 0,
     ) -> None:
         """
         Args:
@@ -28,12 +251,15 @@ class BackupConfiguration:
             paths_to_backup (List[str]): paths which should be backup
             tmp_dir_path (str, optional): path to temporary folder used when making backups. Defaults to './tmp'.
             root_dir (str): root dictory containing files to be backed up, path_to_backup can be relative to this path. Default is current working dir
+            max_incremental_backups (int, optional): how many incremental backups (containing only files changed since previous backup)
+                could be made on top of full backup before next full backup is made. Defaults to 0 - every backup is a full one.
         """
         self.backend: BackupBackend = backend
         self.root_dir: str = root_dir
         self.root_cloud_dir: str = root_cloud_dir
         self.paths_to_backup: List[str] = paths_to_backup
         self.tmp_dir_path: str = tmp_dir_path
+        self.max_incremental_backups: int = max_incremental_backups
 
 
 class BackupPathMetaData(TypedDict):
@@ -45,13 +271,37 @@ class BackupPathMetaData(TypedDict):
 class BackMetaData(TypedDict):
     creation_timestamp_utc: float
     paths_mapping: Dict[str, BackupPathMetaData]
+    # creation timestamp of full backup which incremental backup was made on top of
+    base_creation_timestamp_utc: float
+    # 0 for full backups
+    incremental_number: int
+    # files and directories removed since previous backup
+    removed_files: List[str]
+
+
+class BackupState(TypedDict):
+    """State of last backup kept locally, used to make incremental backups
+    """
+    root_cloud_dir: str
+    # id of full backup file in cloud which following incremental backups are made on top of
+    base_file_id: str
+    meta: BackMetaData
+    # (size, modification time in ns, hash) of every backed up file by its arcname
+    files: Dict[str, Tuple[int, int, str]]
+    # arcnames of every backed up directory
+    directories: List[str]
 
 
 class BackupManager:
 
     BACKUP_DEFAULT_FILENAME: str = 'backup'
     OLD_BACKUP_DEFAULT_FILENAME: str = '_old_backup'
+    INCREMENTAL_BACKUP_FILENAME: str = 'backup_incremental'
+    BACKUP_FILE_EXTENSION: str = '.tar.zst'
+    # backups made by older versions were zip files
+    LEGACY_BACKUP_FILE_EXTENSION: str = '.zip'
     META_FILENAME: str = '__meta__.json'
+    STATE_FILE_PATH: str = './.backup.state.json'
 
     def __init__(
         self,
@@ -63,24 +313,70 @@ class BackupManager:
         self.logger.info(
             f'Initializing backup manager using backup backend: {self.backend.__class__.__name__}')
 
-    def _write_meta_file(self, backup_tmp_dir: str):
+    @staticmethod
+    def _get_incremental_backup_file_name(incremental_number: int) -> str:
+        return f'{BackupManager.INCREMENTAL_BACKUP_FILENAME}_{incremental_number}{BackupManager.BACKUP_FILE_EXTENSION}'
+
+    def _write_meta_file(
+        self,
+        archive_writer: _ArchiveWriter,
+        paths_mapping: Dict[str, BackupPathMetaData],
+        previous_meta: BackMetaData = None,
+        removed_files: List[str] = None
+    ) -> BackMetaData:
+        creation_timestamp_utc: float = datetime.now(
+            tz=timezone.utc).timestamp()
         meta_file_content: BackMetaData = {
-            'creation_timestamp_utc': datetime.now(tz=timezone.utc).timestamp(),
-            'paths_mapping': {
-                f'{i}.zip': {
-                    'path': path,
-                    'extract_path': path if os.path.isdir(path) else os.path.dirname(path)
-                } for i, path in enumerate(self.config.paths_to_backup)
-            }
+            'creation_timestamp_utc': creation_timestamp_utc,
+            'paths_mapping': paths_mapping,
+            'base_creation_timestamp_utc': creation_timestamp_utc,
+            'incremental_number': 0,
+            'removed_files': [] if removed_files is None else removed_files,
         }
+        if previous_meta is not None:
+            meta_file_content['base_creation_timestamp_utc'] = previous_meta['base_creation_timestamp_utc']
+            meta_file_content['incremental_number'] = previous_meta['incremental_number'] + 1
+
+        archive_writer.add_bytes(
+            BackupManager.META_FILENAME,
+            _json_dumps(meta_file_content),
+            int(creation_timestamp_utc)
+        )
+        return meta_file_content
+
+    def _read_state(self) -> BackupState:
+        if not os.path.exists(BackupManager.STATE_FILE_PATH):
+            return None
+        with open(BackupManager.STATE_FILE_PATH, 'rb') as state_file:
+            state: BackupState = _json_loads(state_file.read())
+        backed_up_paths: List[str] = [
+            path_meta['path'] for path_meta in state['meta']['paths_mapping'].values()
+        ]
+        if state['root_cloud_dir'] != self.config.root_cloud_dir or backed_up_paths != self.config.paths_to_backup:
+            # configuration changed since last backup
+            return None
+        return state
+
+    def _write_state(self, state: BackupState) -> None:
+        with open(BackupManager.STATE_FILE_PATH, 'wb') as state_file:
+            state_file.write(_json_dumps(state))
+
+    def _remove_state(self) -> None:
+        if os.path.exists(BackupManager.STATE_FILE_PATH):
+            os.remove(BackupManager.STATE_FILE_PATH)
 
-        with open(f'{backup_tmp_dir}/{BackupManager.META_FILENAME}', 'w+') as meta_file:
-            json.dump(meta_file_content, meta_file)
+    def _validate_before_backup(self) -> Dict[str, os.stat_result]:
+        """Checks if all paths to backup exist.
 
-    def _validate_before_backup(self) -> None:
+        Returns:
+            Dict[str, os.stat_result]: stat of every path to backup, so it is not done again while scanning them
+        """
+        paths_stats: Dict[str, os.stat_result] = {}
         paths_not_existing: List[str] = []
         for path_to_backup in self.config.paths_to_backup:
-            if not os.path.exists(path_to_backup):
+            try:
+                paths_stats[path_to_backup] = os.stat(path_to_backup)
+            except OSError:
                 paths_not_existing.append(path_to_backup.replace('\\', '/'))
         if len(paths_not_existing) > 0:
             error = Exception(
@@ -92,64 +388,261 @@ class BackupManager:
                 click.style(
                     f'Following paths specified for backup does not exist: [{f", ".join(paths_not_existing)}]', fg='red'))
             raise error
+        return paths_stats
 
-    def backup(self) -> None:
-        """Backup paths specified in config using backup backend 
-        """
-        self._validate_before_backup()
-        # clear tmp director if exist and recreate it
-        if os.path.exists(self.config.tmp_dir_path):
-            shutil.rmtree(self.config.tmp_dir_path, ignore_errors=True)
-        backup_tmp_dir: str = os.path.join(self.config.tmp_dir_path, 'tmp')
-        os.makedirs(backup_tmp_dir, exist_ok=True)
+    def _scan_paths_to_backup(
+        self,
+        paths_stats: Dict[str, os.stat_result],
+        paths_mapping: Dict[str, BackupPathMetaData]
+    ) -> Iterator[Tuple[str, str, os.stat_result]]:
+        """Walks all paths to backup, filling paths_mapping for meta file on the way.
 
-        # for every folder to backup zip it to tmp_folder
+        Args:
+            paths_stats (Dict[str, os.stat_result]): stat of every path to backup
+            paths_mapping (Dict[str, BackupPathMetaData]): dict to fill with
+                archive directory to backed up path mapping
+
+        Yields:
+            Iterator[Tuple[str, str, os.stat_result]]: (path, archive name, stat) of every entry to backup
+        """
         for file_id, path_to_backup in enumerate(self.config.paths_to_backup):
-            zile_file_path: str = os.path.join(
-                backup_tmp_dir, f'{file_id}.zip')
-            if os.path.isdir(path_to_backup):
-                # use shutil to zip whole directory
-                shutil.make_archive(zile_file_path.removesuffix(
-                    '.zip'), 'zip', path_to_backup)
+            path_stat: os.stat_result = paths_stats[path_to_backup]
+            is_dir: bool = stat.S_ISDIR(path_stat.st_mode)
+            paths_mapping[f'{file_id}/'] = {
+                'path': path_to_backup,
+                'extract_path': path_to_backup if is_dir else os.path.dirname(path_to_backup)
+            }
+            if is_dir:
+                yield from _scan_directory(path_to_backup, str(file_id), path_stat)
             else:
-                # use zipfile to zip single file
-                with ZipFile(zile_file_path, 'w') as zipf:
-                    zipf.write(path_to_backup,
-                               arcname=os.path.basename(path_to_backup))
+                yield path_to_backup, f'{file_id}/{os.path.basename(path_to_backup)}', path_stat
 
-        # create meta file to later easily retrieve directories structures
-        self._write_meta_file(backup_tmp_dir)
+    def _prepare_tmp_dir(self) -> None:
+        """Creates tmp directory if it does not exist, otherwise removes only
+        backup files left there by previous runs instead of recreating whole directory.
+        """
+        os.makedirs(self.config.tmp_dir_path, exist_ok=True)
+        with os.scandir(self.config.tmp_dir_path) as tmp_dir_entries:
+            for entry in tmp_dir_entries:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                if entry.name == BackupManager.META_FILENAME or \
+                        entry.name.endswith(BackupManager.BACKUP_FILE_EXTENSION) or \
+                        entry.name.endswith(BackupManager.LEGACY_BACKUP_FILE_EXTENSION):
+                    os.unlink(entry.path)
 
-        # zip everything (folders and meta file)
-        backup_file_path: str = f'{self.config.tmp_dir_path}/{BackupManager.BACKUP_DEFAULT_FILENAME}'
-        shutil.make_archive(backup_file_path, 'zip', backup_tmp_dir)
-        shutil.rmtree(backup_tmp_dir)
+    def _prepare_cloud_folder(self) -> Tuple[BackupFolder, BackupFile]:
+        """Creates directory in cloud for backup (if not exist, otherwise do nothing)
+        and finds full backup file already stored there.
 
-        try:
-            # create directory in cloud for backup (if not exist, otherwise do nothing)
-            self.backend.create_folder_if_not_exists(self.config.root_cloud_dir)
-            old_backup_file: BackupFile = self.backend.get_file_by_path(
-                f'{self.config.root_cloud_dir}/{BackupManager.BACKUP_DEFAULT_FILENAME}.zip'
+        Returns:
+            Tuple[BackupFolder, BackupFile]: cloud directory and full backup file (None if it does not exist)
+        """
+        root_cloud_folder: BackupFolder = self.backend.create_folder_if_not_exists(
+            self.config.root_cloud_dir)
+        backup_file: BackupFile = self.backend.get_file_in_folder(
+            root_cloud_folder,
+            f'{BackupManager.BACKUP_DEFAULT_FILENAME}{BackupManager.BACKUP_FILE_EXTENSION}'
+        )
+        return root_cloud_folder, backup_file
+
+    def _upload_full_backup(
+        self,
+        root_cloud_folder: BackupFolder,
+        old_backup_file: BackupFile,
+        archive: BinaryIO,
+        backup_file_name: str
+    ) -> BackupFile:
+        """Uploads full backup in place of old one. Old backup file is only renamed,
+        it is removed later by _remove_replaced_backups.
+
+        Returns:
+            BackupFile: uploaded backup file
+        """
+        if old_backup_file is not None:
+            self.backend.rename_file(
+                old_backup_file, f'{BackupManager.OLD_BACKUP_DEFAULT_FILENAME}{BackupManager.BACKUP_FILE_EXTENSION}'
             )
+        try:
+            return self.backend.upload_stream_to_folder(
+                archive, backup_file_name, root_cloud_folder)
+        except Exception as e:
+            # error uploading backup file - shit... - at least recover latest backup file name
             if old_backup_file is not None:
                 self.backend.rename_file(
-                    old_backup_file, f'{BackupManager.OLD_BACKUP_DEFAULT_FILENAME}.zip'
+                    old_backup_file, backup_file_name
+                )
+            raise e
+
+    def _remove_replaced_backups(self, root_cloud_folder: BackupFolder, old_backup_file: BackupFile) -> None:
+        """Removes old full backup file together with incremental backups made on top of it.
+        Failure is only logged - new backup is already in place and leftover incremental
+        backups are skipped on restore as they were made on top of other full backup.
+        """
+        try:
+            files_to_remove: List[BackupFile] = [] if old_backup_file is None else [
+                old_backup_file]
+            incremental_number: int = 1
+            while True:
+                incremental_backup_file: BackupFile = self.backend.get_file_in_folder(
+                    root_cloud_folder, BackupManager._get_incremental_backup_file_name(
+                        incremental_number)
                 )
+                if incremental_backup_file is None:
+                    break
+                files_to_remove.append(incremental_backup_file)
+                incremental_number += 1
+            self.backend.remove_files(files_to_remove)
+        except Exception as e:
+            self.logger.error(e, exc_info=True)
+            self.logger.warning(
+                click.style(
+                    'Backup uploaded, but failed to remove replaced backup files from cloud', fg='yellow')
+            )
+
+    def _upload_incremental_backup(
+        self,
+        root_cloud_folder: BackupFolder,
+        archive: BinaryIO,
+        backup_file_name: str
+    ) -> None:
+        # leftover of backup which was uploaded but its state was never saved
+        stale_backup_file: BackupFile = self.backend.get_file_in_folder(
+            root_cloud_folder, backup_file_name
+        )
+        if stale_backup_file is not None:
+            self.backend.remove_file(stale_backup_file)
+        self.backend.upload_stream_to_folder(
+            archive, backup_file_name, root_cloud_folder)
+
+    def backup(self) -> None:
+        """Backup paths specified in config using backup backend. If incremental
+        backups are enabled and previous backup state is available, only files
+        changed since previous backup are uploaded.
+        """
+        paths_stats: Dict[str, os.stat_result] = self._validate_before_backup()
+        self._prepare_tmp_dir()
+
+        track_files: bool = self.config.max_incremental_backups > 0
+        previous_state: BackupState = self._read_state() if track_files else None
+        if previous_state is not None and \
+                previous_state['meta']['incremental_number'] >= self.config.max_incremental_backups:
+            previous_state = None
+        is_incremental: bool = previous_state is not None
+        previous_files: Dict[str, Tuple[int, int, str]] = \
+            previous_state['files'] if is_incremental else {}
+        previous_directories: List[str] = \
+            previous_state.get('directories', []) if is_incremental else []
+
+        paths_mapping: Dict[str, BackupPathMetaData] = {}
+        entries: List[Tuple[str, str, os.stat_result]] = list(
+            self._scan_paths_to_backup(paths_stats, paths_mapping))
+        current_files: Set[str] = {
+            arcname for _, arcname, entry_stat in entries if not stat.S_ISDIR(entry_stat.st_mode)
+        }
+        directories: List[str] = [
+            arcname for _, arcname, entry_stat in entries if stat.S_ISDIR(entry_stat.st_mode)
+        ]
+        current_directories: Set[str] = set(directories)
+        # path which changed its type (file <-> directory) is removed too, so
+        # restore can recreate it from scratch
+        removed_files: List[str] = [
+            arcname for arcname in previous_files if arcname not in current_files
+        ] + [
+            arcname for arcname in previous_directories if arcname not in current_directories
+        ]
+        previous_directories_set: Set[str] = set(previous_directories)
+        directories_added: int = sum(
+            1 for arcname in directories if arcname not in previous_directories_set)
+
+        # talk to cloud in background while archive is being compressed
+        cloud_executor = ThreadPoolExecutor(max_workers=1)
+        cloud_folder_future: Future = cloud_executor.submit(
+            self._prepare_cloud_folder)
+        cloud_executor.shutdown(wait=False)
+
+        # tar every path to backup into single zstd compressed archive, each one
+        # under its own "{file_id}/" directory. Compression runs in zstd worker
+        # threads (one per CPU) while tar stream is being written. Archive is kept
+        # in memory and spilled to tmp directory only when it grows big.
+        if is_incremental:
+            backup_file_name: str = BackupManager._get_incremental_backup_file_name(
+                previous_state['meta']['incremental_number'] + 1)
+        else:
+            backup_file_name: str = f'{BackupManager.BACKUP_DEFAULT_FILENAME}{BackupManager.BACKUP_FILE_EXTENSION}'
+        archive = tempfile.SpooledTemporaryFile(
+            max_size=ARCHIVE_SPOOL_MAX_SIZE, dir=self.config.tmp_dir_path)
+        files: Dict[str, Tuple[int, int, str]] = {}
+        files_added: int = 0
+        full_backup_required: bool = False
+        # zip archives had CRC32 of every entry, zstd frame checksum (XXH64)
+        # guards archive content instead and is verified on decompression
+        compressor = zstandard.ZstdCompressor(
+            level=ZSTD_COMPRESSION_LEVEL, threads=-1, write_checksum=True)
+        try:
             try:
-                self.backend.upload_file(
-                    f'{backup_file_path}.zip', self.config.root_cloud_dir)
-            except Exception as e:
-                # error uploading backup file - shit... - at least recover latest backup file name
-                if old_backup_file is not None:
-                    self.backend.rename_file(
-                        old_backup_file, f'{BackupManager.BACKUP_DEFAULT_FILENAME}.zip'
+                with compressor.stream_writer(archive, closefd=False) as compressed_stream, \
+                        _open_archive_writer(compressed_stream) as archive_writer:
+                    # meta file goes first so restore knows where to extract paths
+                    # while reading archive as a stream
+                    meta_file_content: BackMetaData = self._write_meta_file(
+                        archive_writer,
+                        paths_mapping,
+                        previous_state['meta'] if is_incremental else None,
+                        removed_files
                     )
-                raise e
+                    for entry_path, arcname, entry_stat in entries:
+                        if stat.S_ISDIR(entry_stat.st_mode):
+                            # directories are always written so new empty ones are restored too
+                            archive_writer.add_directory(arcname, entry_stat)
+                            continue
+                        previous_file: Tuple[int, int, str] = previous_files.get(
+                            arcname)
+                        if previous_file is not None:
+                            previous_size, previous_mtime_ns, previous_hash = previous_file
+                            if previous_size == entry_stat.st_size and previous_mtime_ns == entry_stat.st_mtime_ns:
+                                files[arcname] = previous_file
+                                continue
+                            # file was touched - compare its content before uploading it again
+                            if previous_size == entry_stat.st_size and previous_hash == _hash_file(entry_path):
+                                files[arcname] = (
+                                    entry_stat.st_size, entry_stat.st_mtime_ns, previous_hash)
+                                continue
+                        file_hash = _new_file_hash() if track_files else None
+                        archive_writer.add_file(
+                            entry_path, arcname, entry_stat, file_hash)
+                        files_added += 1
+                        if track_files:
+                            files[arcname] = (
+                                entry_stat.st_size, entry_stat.st_mtime_ns, file_hash.hexdigest())
+
+                if is_incremental and files_added == 0 and directories_added == 0 and len(removed_files) == 0:
+                    # do not leave backend working in background
+                    wait([cloud_folder_future])
+                    previous_state['files'] = files
+                    previous_state['directories'] = directories
+                    self._write_state(previous_state)
+                    self.logger.info(click.style(
+                        'No files changed since previous backup, nothing to upload', fg='green'))
+                    return None
+
+                # reuse cloud directory for all operations instead of finding it by path again
+                root_cloud_folder, backup_file = cloud_folder_future.result()
+                archive.seek(0)
+                if is_incremental and (backup_file is None or backup_file.id != previous_state.get('base_file_id')):
+                    # state is out of sync with cloud - incremental backup would be
+                    # restored on top of other full backup
+                    full_backup_required = True
+                elif is_incremental:
+                    base_file_id: str = previous_state['base_file_id']
+                    self._upload_incremental_backup(
+                        root_cloud_folder, archive, backup_file_name)
+                else:
+                    uploaded_backup_file: BackupFile = self._upload_full_backup(
+                        root_cloud_folder, backup_file, archive, backup_file_name)
+                    base_file_id: str = None if uploaded_backup_file is None else uploaded_backup_file.id
             finally:
-                os.remove(f'{backup_file_path}.zip')
-            # everything was ok - remove old backup file if exist
-            if old_backup_file is not None:
-                self.backend.remove_file(old_backup_file)
+                archive.close()
         except Exception as e:
             self.logger.error(e, exc_info=True)
             self.logger.error(
@@ -157,45 +650,263 @@ class BackupManager:
                     f'Fail to backup files using using backup backend: {self.backend.__class__.__name__}', fg='red')
             )
             return e  # fails silently
+        if full_backup_required:
+            self._remove_state()
+            self.logger.warning(click.style(
+                'Full backup, required for incremental backup, does not exist in cloud or was replaced. Making full backup instead', fg='yellow'))
+            return self.backup()
+        # state is saved before cleanup, so it always matches backup already in cloud
+        if track_files and base_file_id is None:
+            # incremental backups could not be checked against full backup they are made on
+            self._remove_state()
+            self.logger.warning(click.style(
+                'Backend did not return uploaded backup file, next backup will be a full one', fg='yellow'))
+        elif track_files:
+            self._write_state({
+                'root_cloud_dir': self.config.root_cloud_dir,
+                'base_file_id': base_file_id,
+                'meta': meta_file_content,
+                'files': files,
+                'directories': directories,
+            })
+        if not is_incremental:
+            self._remove_replaced_backups(root_cloud_folder, backup_file)
         self.logger.info(click.style(
             'Backup finished with success!', fg='green'))
         return None
 
-    def restore(self) -> None:
+    @staticmethod
+    def _get_archive_names_to_restore(meta_file_content: BackMetaData, paths: List[str] = None) -> Set[str]:
+        """Finds names of archive directories holding given backed up paths.
+
+        Args:
+            meta_file_content (BackMetaData): backup meta file content
+            paths (List[str], optional): backed up paths to restore. Defaults to None meaning all of them.
+
+        Returns:
+            Set[str]: archive directories names
+        """
+        if paths is None:
+            return set(meta_file_content['paths_mapping'].keys())
+        normalized_paths: Set[str] = {os.path.normpath(path) for path in paths}
+        return {
+            archive_name for archive_name, path_meta in meta_file_content['paths_mapping'].items()
+            if os.path.normpath(path_meta['path']) in normalized_paths
+        }
+
+    def _read_meta_file(self, backup_file_path: str) -> BackMetaData:
+        """Reads only meta file from downloaded backup, without extracting anything.
+
+        Args:
+            backup_file_path (str): path to downloaded backup file
+
+        Returns:
+            BackMetaData: backup meta file content
+        """
+        if backup_file_path.endswith(BackupManager.LEGACY_BACKUP_FILE_EXTENSION):
+            with ZipFile(backup_file_path, 'r') as zip_ref:
+                return _json_loads(zip_ref.read(BackupManager.META_FILENAME))
+        decompressor = zstandard.ZstdDecompressor()
+        with open(backup_file_path, 'rb') as backup_file, \
+                decompressor.stream_reader(backup_file) as decompressed_stream, \
+                tarfile.open(fileobj=decompressed_stream, mode='r|') as tar:
+            # meta file is always the first member
+            return _json_loads(tar.extractfile(tar.next()).read())
+
+    def _restore_from_tar(
+        self,
+        backup_file_path: str,
+        base_creation_timestamp_utc: float = None,
+        paths: List[str] = None
+    ) -> BackMetaData:
+        """Restores files from tar backup. Archive is read as a stream so entries
+        of paths which are not restored are skipped without being written anywhere.
+
+        Args:
+            backup_file_path (str): path to downloaded backup file
+            base_creation_timestamp_utc (float, optional): if specified, backup is restored only
+                if it is incremental backup made on top of full backup created at that time
+            paths (List[str], optional): backed up paths to restore. Defaults to None meaning all of them.
+
+        Returns:
+            BackMetaData: backup meta file content or None if backup was not restored
+        """
+        meta_file_content: BackMetaData = None
+        archive_names_to_restore: Set[str] = None
+        decompressor = zstandard.ZstdDecompressor()
+        with open(backup_file_path, 'rb') as backup_file, \
+                decompressor.stream_reader(backup_file) as decompressed_stream, \
+                tarfile.open(fileobj=decompressed_stream, mode='r|') as tar:
+            # reject absolute paths, links outside extract path etc. when supported
+            tar.extraction_filter = getattr(tarfile, 'data_filter', None)
+            for member in tar:
+                if member.name == BackupManager.META_FILENAME:
+                    # meta file is always the first member
+                    meta_file_content = _json_loads(
+                        tar.extractfile(member).read())
+                    if base_creation_timestamp_utc is not None and \
+                            meta_file_content.get('base_creation_timestamp_utc') != base_creation_timestamp_utc:
+                        return None
+                    archive_names_to_restore = BackupManager._get_archive_names_to_restore(
+                        meta_file_content, paths)
+                    # removed before anything is extracted, so paths which changed
+                    # their type can be extracted in place of old ones
+                    self._remove_deleted_paths(
+                        meta_file_content, archive_names_to_restore)
+                    continue
+                file_id, _, member_path = member.name.partition('/')
+                if member_path == '' or f'{file_id}/' not in archive_names_to_restore:
+                    # "{file_id}" directory itself or path not selected for restore
+                    continue
+                path_meta: BackupPathMetaData = meta_file_content['paths_mapping'][f'{file_id}/']
+                # strip "{file_id}/" prefix so member lands directly in extract path
+                member.name = member_path
+                tar.extract(member, os.path.join(
+                    self.config.root_dir, path_meta['extract_path']))
+        return meta_file_content
+
+    def _remove_deleted_paths(self, meta_file_content: BackMetaData, archive_names_to_restore: Set[str]) -> None:
+        """Removes files and directories which were deleted since previous backup.
+
+        Args:
+            meta_file_content (BackMetaData): meta file content of restored incremental backup
+            archive_names_to_restore (Set[str]): archive directories names of restored paths
+        """
+        for removed_file in meta_file_content.get('removed_files', []):
+            file_id, _, file_path = removed_file.partition('/')
+            if file_path == '' or f'{file_id}/' not in archive_names_to_restore:
+                continue
+            path_meta: BackupPathMetaData = meta_file_content['paths_mapping'][f'{file_id}/']
+            target_dir_path: str = os.path.realpath(os.path.join(
+                self.config.root_dir, path_meta['extract_path']))
+            removed_file_path: str = os.path.normpath(
+                os.path.join(target_dir_path, file_path))
+            # resolve parent directories only - removed symlink itself is not followed
+            removed_file_path = os.path.join(
+                os.path.realpath(os.path.dirname(removed_file_path)), os.path.basename(removed_file_path))
+            if removed_file_path == target_dir_path or \
+                    os.path.commonpath([target_dir_path, removed_file_path]) != target_dir_path:
+                self.logger.warning(click.style(
+                    f'Skipping removal of path "{removed_file}" which is outside of restored directory', fg='yellow'))
+                continue
+            if os.path.isdir(removed_file_path) and not os.path.islink(removed_file_path):
+                shutil.rmtree(removed_file_path)
+            elif os.path.lexists(removed_file_path):
+                os.remove(removed_file_path)
+
+    def _restore_from_zip(self, backup_file_path: str, paths: List[str] = None) -> BackMetaData:
+        with ZipFile(backup_file_path, 'r') as zip_ref:
+            # read meta file
+            meta_file_content: BackMetaData = _json_loads(
+                zip_ref.read(BackupManager.META_FILENAME))
+            archive_names_to_restore: Set[str] = BackupManager._get_archive_names_to_restore(
+                meta_file_content, paths)
+            # recreate folder structure
+            for archive_name, path_meta in meta_file_content['paths_mapping'].items():
+                if archive_name not in archive_names_to_restore:
+                    continue
+                extract_path: str = os.path.join(
+                    self.config.root_dir, path_meta['extract_path'])
+                # every path is stored as nested zip file
+                with zip_ref.open(archive_name) as nested_file, ZipFile(nested_file, 'r') as nested_zip:
+                    nested_zip.extractall(extract_path)
+        return meta_file_content
+
+    def _restore_incremental_backups(self, base_meta: BackMetaData, paths: List[str] = None) -> BackMetaData:
+        """Applies incremental backups made on top of already restored full backup
+        in order they were made.
+
+        Args:
+            base_meta (BackMetaData): meta file content of restored full backup
+            paths (List[str], optional): backed up paths to restore. Defaults to None meaning all of them.
+
+        Returns:
+            BackMetaData: meta file content of last applied backup
+        """
+        base_creation_timestamp_utc: float = base_meta.get(
+            'base_creation_timestamp_utc', base_meta['creation_timestamp_utc'])
+        meta_file_content: BackMetaData = base_meta
+        incremental_number: int = 1
+        while True:
+            incremental_backup_file: BackupFile = self.backend.get_file_by_path(os.path.join(
+                self.config.root_cloud_dir, BackupManager._get_incremental_backup_file_name(incremental_number)))
+            if incremental_backup_file is None:
+                break
+            self.backend.download_file(
+                incremental_backup_file, self.config.tmp_dir_path)
+            incremental_meta: BackMetaData = self._restore_from_tar(
+                os.path.join(self.config.tmp_dir_path,
+                             incremental_backup_file.name),
+                base_creation_timestamp_utc,
+                paths
+            )
+            if incremental_meta is None:
+                # leftover made on top of another full backup
+                break
+            meta_file_content = incremental_meta
+            incremental_number += 1
+        return meta_file_content
+
+    def _get_backup_file(self) -> BackupFile:
+        for extension in (BackupManager.BACKUP_FILE_EXTENSION, BackupManager.LEGACY_BACKUP_FILE_EXTENSION):
+            backup_file: BackupFile = self.backend.get_file_by_path(os.path.join(
+                self.config.root_cloud_dir, f'{BackupManager.BACKUP_DEFAULT_FILENAME}{extension}'))
+            if backup_file is not None:
+                return backup_file
+        return None
+
+    def restore(self, paths: List[str] = None) -> None:
         """Restores files from backup
+
+        Args:
+            paths (List[str], optional): backed up paths to restore, as specified in
+                configuration when backup was made. Defaults to None meaning all of them.
         """
         os.makedirs(self.config.tmp_dir_path, exist_ok=True)
-        backup_file_path: str = os.path.join(
-            self.config.root_cloud_dir, f'{BackupManager.BACKUP_DEFAULT_FILENAME}.zip')
-        backup_file: BackupFile = self.backend.get_file_by_path(
-            backup_file_path)
+        backup_file: BackupFile = self._get_backup_file()
         if backup_file is None:
             print(
-                f'Fail to restore from backup - no backup.zip file exist in configured path: "{os.path.dirname(backup_file_path)}", there is no hope left :(')
+                f'Fail to restore from backup - no {BackupManager.BACKUP_DEFAULT_FILENAME}{BackupManager.BACKUP_FILE_EXTENSION} file exist in configured path: "{self.config.root_cloud_dir}", there is no hope left :(')
             return
         else:
             self.backend.download_file(backup_file, self.config.tmp_dir_path)
             downloaded_file_path = os.path.join(
-                self.config.tmp_dir_path, f'{BackupManager.BACKUP_DEFAULT_FILENAME}.zip')
-            extracted_backup_path: str = os.path.join(
-                self.config.tmp_dir_path, 'downloaded_backup')
-            with ZipFile(downloaded_file_path, 'r') as zip_ref:
-                zip_ref.extractall(extracted_backup_path)
-            # read meta file
-            with open(f'{extracted_backup_path}/{BackupManager.META_FILENAME}', 'r') as meta_file:
-                meta_file_content: BackMetaData = json.load(meta_file)
-            # recreate folder structure
-            for zip_file_name, path_meta in meta_file_content['paths_mapping'].items():
-                with ZipFile(os.path.join(extracted_backup_path, zip_file_name), 'r') as zip_ref:
-                    zip_ref.extractall(os.path.join(
-                        self.config.root_dir, path_meta['extract_path']))
+                self.config.tmp_dir_path, backup_file.name)
+            if paths is not None:
+                backup_meta: BackMetaData = self._read_meta_file(
+                    downloaded_file_path)
+                backed_up_paths: List[str] = [
+                    path_meta['path'] for path_meta in backup_meta['paths_mapping'].values()
+                ]
+                normalized_backed_up_paths: Set[str] = {
+                    os.path.normpath(path) for path in backed_up_paths}
+                unknown_paths: List[str] = [
+                    path for path in paths if os.path.normpath(path) not in normalized_backed_up_paths
+                ]
+                if len(unknown_paths) > 0:
+                    print(click.style(
+                        f'Fail to restore from backup - following paths are not in backup: [{", ".join(unknown_paths)}]. '
+                        f'Backed up paths: [{", ".join(backed_up_paths)}]', fg='red'))
+                    shutil.rmtree(self.config.tmp_dir_path)
+                    return
+            if downloaded_file_path.endswith(BackupManager.LEGACY_BACKUP_FILE_EXTENSION):
+                meta_file_content: BackMetaData = self._restore_from_zip(
+                    downloaded_file_path, paths)
+            else:
+                meta_file_content: BackMetaData = self._restore_from_tar(
+                    downloaded_file_path, paths=paths)
+                meta_file_content = self._restore_incremental_backups(
+                    meta_file_content, paths)
             backup_date: datetime = datetime.fromtimestamp(
                 meta_file_content['creation_timestamp_utc'], tz=timezone.utc)
             backup_date = backup_date.astimezone(tz=None)  # to local timestamp
             print(click.style(
                 f'Files restored successfully from cloud backup.', fg='green'))
             print(f'Backup date: {backup_date.strftime("%d.%m.%Y %H:%M:%S")}')
-            print(f'Restored {len(meta_file_content["paths_mapping"])} paths:')
-            for path_meta in meta_file_content['paths_mapping'].values():
-                print(f'     * "{path_meta["path"]}"')
+            archive_names_to_restore: Set[str] = BackupManager._get_archive_names_to_restore(
+                meta_file_content, paths)
+            print(f'Restored {len(archive_names_to_restore)} paths:')
+            for archive_name, path_meta in meta_file_content['paths_mapping'].items():
+                if archive_name in archive_names_to_restore:
+                    print(f'     * "{path_meta["path"]}"')
             shutil.rmtree(self.config.tmp_dir_path)
@@ -13,9 +13,12 @@ import random
 import binascii
 import tempfile
 import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
-from tenacity import retry, wait_exponential, retry_if_exception_type
+from tenacity import (retry, wait_exponential, retry_if_exception_type,
+                      stop_after_attempt)
 
 from .errors import ValidationError, RequestError
 from .crypto import (a32_to_base64, encrypt_key, base64_url_encode,
@@ -150,9 +153,7 @@ class Mega:
             sid = binascii.unhexlify('0' + sid if len(sid) % 2 else sid)
             self.sid = base64_url_encode(sid[:43])
 
-    @retry(retry=retry_if_exception_type(RuntimeError),
-           wait=wait_exponential(multiplier=2, min=2, max=60))
-    def _api_request(self, data):
+    def _api_post(self, data):
         params = {'id': self.sequence_num}
         self.sequence_num += 1
 
@@ -170,7 +171,12 @@ class Mega:
             data=json.dumps(data),
             timeout=self.timeout,
         )
-        json_resp = json.loads(response.text)
+        return json.loads(response.text)
+
+    @retry(retry=retry_if_exception_type(RuntimeError),
+           wait=wait_exponential(multiplier=2, min=2, max=60))
+    def _api_request(self, data):
+        json_resp = self._api_post(data)
         try:
             if isinstance(json_resp, list):
                 int_resp = json_resp[0] if isinstance(json_resp[0],
@@ -189,6 +195,23 @@ class Mega:
             raise RequestError(int_resp)
         return json_resp[0]
 
+    @retry(retry=retry_if_exception_type(RuntimeError),
+           wait=wait_exponential(multiplier=2, min=2, max=60))
+    def _api_batch_request(self, commands):
+        """
+        Send list of commands in single request, returns list of their
+        results in the same order (negative numbers are error codes)
+        """
+        json_resp = self._api_post(commands)
+        if isinstance(json_resp, int):
+            # whole request was rejected
+            if json_resp == -3:
+                msg = 'Request failed, retrying'
+                logger.info(msg)
+                raise RuntimeError(msg)
+            raise RequestError(json_resp)
+        return json_resp
+
     def _parse_url(self, url):
         """Parse file id and key from url."""
         if '/file/' in url:
@@ -747,7 +770,42 @@ class Mega:
             shutil.move(temp_output_file.name, output_path)
             return output_path
 
-    def upload(self, filename, dest=None, dest_filename=None):
+    @retry(retry=retry_if_exception_type((RuntimeError,
+                                          requests.RequestException)),
+           wait=wait_exponential(multiplier=2, min=2, max=60),
+           stop=stop_after_attempt(5),
+           reraise=True)
+    def _upload_chunk(self, ul_url, chunk_start, chunk):
+        response = requests.post(ul_url + "/" + str(chunk_start),
+                                 data=chunk,
+                                 timeout=self.timeout)
+        response.raise_for_status()
+        # errors are returned as negative integer in response body
+        if response.text.startswith('-') and response.text[1:].isdigit():
+            error_code = int(response.text)
+            if error_code == -3:
+                msg = 'Chunk upload failed, retrying'
+                logger.info(msg)
+                raise RuntimeError(msg)
+            raise RequestError(error_code)
+        return response.text
+
+    def upload(self, filename, dest=None, dest_filename=None, workers=1):
+        """
+        Upload file, chunks are encrypted in order but sent to the
+        server by up to `workers` threads at once
+        """
+        with open(filename, 'rb') as input_file:
+            return self.upload_fileobj(
+                input_file, dest_filename or os.path.basename(filename),
+                dest, workers)
+
+    def upload_fileobj(self, input_file, dest_filename, dest=None,
+                       workers=1):
+        """
+        Upload content of seekable binary file object, starting from its
+        current position
+        """
         # determine storage node
         if dest is None:
             # if none set, upload to cloud drive node
@@ -756,8 +814,10 @@ class Mega:
             dest = self.root_id
 
         # request upload url, call 'u' method
-        with open(filename, 'rb') as input_file:
-            file_size = os.path.getsize(filename)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            start_position = input_file.tell()
+            file_size = input_file.seek(0, os.SEEK_END) - start_position
+            input_file.seek(start_position)
             ul_url = self._api_request({'a': 'u', 's': file_size})['p']
 
             # generate random aes key (128) for file
@@ -775,6 +835,8 @@ class Mega:
                                     mac_str.encode("utf8"))
             iv_str = a32_to_str([ul_key[4], ul_key[5], ul_key[4], ul_key[5]])
             if file_size > 0:
+                # limit chunks held in memory while waiting for upload
+                pending_uploads = deque()
                 for chunk_start, chunk_size in get_chunks(file_size):
                     chunk = input_file.read(chunk_size)
                     upload_progress += len(chunk)
@@ -797,13 +859,19 @@ class Mega:
 
                     # encrypt file and upload
                     chunk = aes.encrypt(chunk)
-                    output_file = requests.post(ul_url + "/" +
-                                                str(chunk_start),
-                                                data=chunk,
-                                                timeout=self.timeout)
-                    completion_file_handle = output_file.text
+                    pending_uploads.append(
+                        executor.submit(self._upload_chunk, ul_url,
+                                        chunk_start, chunk))
+                    if len(pending_uploads) > 2 * workers:
+                        # only request finishing the upload returns handle
+                        completion_file_handle = (
+                            pending_uploads.popleft().result()
+                            or completion_file_handle)
                     logger.info('%s of %s uploaded', upload_progress,
                                 file_size)
+                for pending_upload in pending_uploads:
+                    completion_file_handle = (pending_upload.result()
+                                              or completion_file_handle)
             else:
                 output_file = requests.post(ul_url + "/0",
                                             data='',
@@ -818,7 +886,6 @@ class Mega:
             # determine meta mac
             meta_mac = (file_mac[0] ^ file_mac[1], file_mac[2] ^ file_mac[3])
 
-            dest_filename = dest_filename or os.path.basename(filename)
             attribs = {'n': dest_filename}
 
             encrypt_attribs = base64_url_encode(
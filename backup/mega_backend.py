@@ -1,17 +1,21 @@
 from __future__ import annotations
 import os
-from typing import List, Tuple
+import time
+from typing import BinaryIO, Dict, List
 from .backend import *
 from .mega import Mega
 
 
 class MegaBackupFolder:
+    __slots__ = ('name', 'path', 'id')
     name: str
     path: str
     id: str
 
 
 class MegaBackupFile(BackupFolder):
+    # no instance __dict__ - one object is created for every file in cloud listing
+    __slots__ = ('parent_dir', '_response')
     parent_dir: MegaBackupFolder
     _response: dict
 
@@ -31,6 +35,12 @@ class MegaBackupBackend(BackupBackend):
     You will need free mega account to use it
     """
 
+    # number of chunks uploaded to Mega at once
+    UPLOAD_WORKERS: int = 8
+    # cached node listing older than that is fetched again, so long running
+    # processes (like auto backups) do not work on outdated cloud state
+    NODES_CACHE_TTL_SECONDS: int = 5 * 60
+
     def __init__(
         self,
         login: str = None,
@@ -42,6 +52,11 @@ class MegaBackupBackend(BackupBackend):
             password (str, optional): if not specified it will be prompted
         """
         self.m: Mega = None
+        # listing of all cloud nodes, reused until something is changed in cloud
+        self._nodes_cache: Dict[str, dict] = None
+        self._nodes_cache_time: float = None
+        # files by their paths for every folder id, built from nodes cache
+        self._folders_files_cache: Dict[str, Dict[str, MegaBackupFile]] = {}
         super().__init__(login, password)
 
     def _login(
@@ -66,11 +81,38 @@ class MegaBackupBackend(BackupBackend):
             self.logger.error(e, exc_info=True)
             raise e
 
+    def _get_nodes(self) -> Dict[str, dict]:
+        if self._nodes_cache is None or \
+                time.monotonic() - self._nodes_cache_time > MegaBackupBackend.NODES_CACHE_TTL_SECONDS:
+            self._invalidate_nodes_cache()
+            self._nodes_cache = self.m.get_files()
+            self._nodes_cache_time = time.monotonic()
+        return self._nodes_cache
+
+    def _invalidate_nodes_cache(self) -> None:
+        self._nodes_cache = None
+        self._folders_files_cache = {}
+
+    def _get_folder_files(self, folder: MegaBackupFolder) -> Dict[str, MegaBackupFile]:
+        folder_files: Dict[str, MegaBackupFile] = self._folders_files_cache.get(
+            folder.id)
+        if folder_files is None:
+            folder_files = {}
+            for node in self._get_nodes().values():
+                if node['p'] == folder.id:
+                    file: MegaBackupFile = MegaBackupFile.from_api_response(
+                        node, folder.path)
+                    folder_files[file.path] = file
+            self._folders_files_cache[folder.id] = folder_files
+        return folder_files
 
     def _get_folder_by_path(self, path: str) -> MegaBackupFolder:
         # Retreive file parent dir folder - it could not be root folder! never!
         try:
-            folder_id: str = self.m.find(path)[0]
+            folder_id: str = self.m.find_path_descriptor(
+                path, files=self._get_nodes())
+            if folder_id is None:
+                raise Exception(f'No folder with path: "{path}"')
             folder: MegaBackupFolder = MegaBackupFolder()
             folder.id = folder_id
             folder.path = path
@@ -95,15 +137,19 @@ class MegaBackupBackend(BackupBackend):
         # parent dir folder could not be root cloud folder! never!
         parent_folder: MegaBackupFolder = self._get_folder_by_path(
             os.path.dirname(path))
-        response = self.m.get_files_in_node(parent_folder.id)
-        files: List[MegaBackupFile] = [
-            MegaBackupFile.from_api_response(e, parent_folder.path) for e in response.values()
-        ]
-        file: MegaBackupFile = None
-        for file in files:
-            if file.path == path:
-                return file
-        return file
+        return self.get_file_in_folder(parent_folder, os.path.basename(path))
+
+    def get_file_in_folder(self, folder: MegaBackupFolder, file_name: str) -> MegaBackupFile:
+        """Finds and returns file by its name in already retrieved folder.
+
+        Args:
+            folder (MegaBackupFolder): folder containing file
+            file_name (str): file name
+
+        Returns:
+            MegaBackupFile: file or None if it does not exist
+        """
+        return self._get_folder_files(folder).get(f'{folder.path}/{file_name}')
 
     def create_folder_if_not_exists(self, path: str) -> BackupFolder:
         """Creates folder with given path, do nothing if folder already exists
@@ -121,13 +167,15 @@ class MegaBackupBackend(BackupBackend):
         folder.path = path
         folder.name = folder_name
 
-        folder_data: Tuple[str, dict] = self.m.find(path)
-        if folder_data is None:
+        folder_id: str = self.m.find_path_descriptor(
+            path, files=self._get_nodes())
+        if folder_id is None:
             # folder does not exists
             dirs = self.m.create_folder(path)
+            self._invalidate_nodes_cache()
             folder.id = dirs[folder_name]
         else:
-            folder.id = folder_data[0]
+            folder.id = folder_id
 
         return folder
 
@@ -138,16 +186,48 @@ class MegaBackupBackend(BackupBackend):
             file_path (str): local path for file to upload
             directory_path (str): path to directory in cloud where file should be uploaded
 
+        Returns:
+            BackupFile: uploaded file object
+        """
+        with open(file_path, 'rb') as file:
+            return self.upload_stream(file, os.path.basename(file_path), directory_path)
+
+    def upload_stream(self, fileobj: BinaryIO, name: str, directory_path: str) -> BackupFile:
+        """Uploads content of seekable binary file object to cloud directory.
+
+        Args:
+            fileobj (BinaryIO): file object to read uploaded content from
+            name (str): name of the file created in cloud
+            directory_path (str): path to directory in cloud where file should be uploaded
+
         Returns:
             BackupFile: uploaded file object
         """
         parent_dir: MegaBackupFolder = self._get_folder_by_path(directory_path)
+        return self.upload_stream_to_folder(fileobj, name, parent_dir)
+
+    def upload_stream_to_folder(self, fileobj: BinaryIO, name: str, folder: MegaBackupFolder) -> BackupFile:
+        """Uploads content of seekable binary file object to already retrieved cloud folder.
+
+        Args:
+            fileobj (BinaryIO): file object to read uploaded content from
+            name (str): name of the file created in cloud
+            folder (MegaBackupFolder): cloud folder where file should be uploaded
+
+        Returns:
+            BackupFile: uploaded file object
+        """
         try:
-            self.m.upload(file_path, parent_dir.id)
+            response: dict = self.m.upload_fileobj(fileobj, name, folder.id,
+                                                   workers=MegaBackupBackend.UPLOAD_WORKERS)
+            self._invalidate_nodes_cache()
+            # created node is returned encrypted, same as in files listing
+            node: dict = self.m._process_file(response['f'][0], {})
+            return MegaBackupFile.from_api_response(node, folder.path)
         except Exception as e:
             self.logger.error(e, exc_info=True)
             e = Exception(
-                f'Failed to upload local file "{file_path}" to backup Mega cloud folder: "{directory_path}". See logs to details')
+                f'Failed to upload file "{name}" to backup Mega cloud folder: "{folder.path}". See logs to details')
             self.logger.error(e, exc_info=True)
             raise e
 
@@ -160,6 +240,7 @@ class MegaBackupBackend(BackupBackend):
         """
         try:
             self.m.rename([None, file._response], new_name)
+            self._invalidate_nodes_cache()
         except Exception as e:
             self.logger.error(e, exc_info=True)
             e = Exception(
@@ -175,6 +256,7 @@ class MegaBackupBackend(BackupBackend):
         """
         try:
             self.m.destroy(file.id)
+            self._invalidate_nodes_cache()
         except Exception as e:
             self.logger.error(e, exc_info=True)
             e = Exception(
@@ -182,6 +264,50 @@ class MegaBackupBackend(BackupBackend):
             self.logger.error(e, exc_info=True)
             raise e
 
+    def remove_files(self, files: List[MegaBackupFile]) -> None:
+        """Removes many files (not reversable) from cloud directories in a single request
+
+        Args:
+            files (List[MegaBackupFile]): files to remove
+        """
+        if len(files) == 0:
+            return
+        try:
+            self._batch([
+                {'a': 'd', 'n': file.id, 'i': self.m.request_id} for file in files
+            ])
+        except Exception as e:
+            self.logger.error(e, exc_info=True)
+            e = Exception(
+                f'Failed to delete cloud files [{", ".join(file.path for file in files)}] while replacing backup files. See logs to details')
+            self.logger.error(e, exc_info=True)
+            raise e
+        finally:
+            # some of commands could succeed even if others failed
+            self._invalidate_nodes_cache()
+
+    def _batch(self, requests_list: List[dict]) -> list:
+        """Sends many Mega API commands in a single HTTP request.
+
+        Args:
+            requests_list (List[dict]): API commands
+
+        Raises:
+            Exception: if any of commands failed
+
+        Returns:
+            list: results of commands, in the same order as commands
+        """
+        results: list = self.m._api_batch_request(requests_list)
+        failed_commands: List[str] = [
+            f'{command["a"]}: {result}' for command, result in zip(requests_list, results)
+            if isinstance(result, int) and result < 0
+        ]
+        if len(failed_commands) > 0:
+            raise Exception(
+                f'Mega API commands failed with error codes [{", ".join(failed_commands)}]')
+        return results
+
     def download_file(self, file: MegaBackupFile, output_path: str) -> None:
         """Download file from backend
 
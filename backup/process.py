@@ -1,26 +1,57 @@
 from .manager import BackupManager
 from .cli import cli, CLIContext, read_configuration
-from time import time
 from datetime import datetime, timedelta
 import logging
+import re
+import select
+import signal
+import socket
 import time
 import click
 
 
 HOUR_TO_SECONDS: int = 60 * 60
 RETRY_IN_MINUTES: int = 10
+_TIME_RE = re.compile(r'^(\d+)h$')
 
 
 def parse_time_string(time_string: str) -> int:
-    if 'h' not in time_string:
-        raise ValueError('Time string should contain "h" sufix')
-    time_string = time_string.replace('h', '')
-    try:
-        time_value: int = int(time_string)
-    except:
+    time_match = _TIME_RE.match(time_string)
+    if time_match is None:
         raise ValueError(
             'Time string should be integer with "h" sufix specifying how often backups should be made')
-    return time_value
+    return int(time_match.group(1))
+
+
+class _StopRequest:
+    """Set on SIGTERM so process stops cleanly instead of being killed mid-wait.
+    Signal handler only sets a flag, so no lock is taken inside it. Waiting is
+    woken up by signal module writing to wakeup socket when signal arrives.
+    """
+
+    def __init__(self) -> None:
+        self.requested: bool = False
+        self._reader, self._writer = socket.socketpair()
+        self._reader.setblocking(False)
+        self._writer.setblocking(False)
+        signal.set_wakeup_fd(self._writer.fileno())
+        signal.signal(signal.SIGTERM, self._handle_signal)
+
+    def _handle_signal(self, signum, frame) -> None:
+        self.requested = True
+
+    def wait(self, timeout: float) -> None:
+        deadline: float = time.monotonic() + timeout
+        while not self.requested:
+            remaining: float = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            readable, _, _ = select.select([self._reader], [], [], remaining)
+            if len(readable) > 0:
+                try:
+                    self._reader.recv(4096)
+                except BlockingIOError:
+                    pass
 
 
 def get_next_planned_backup_communicate(wait_hours: int = 0, wait_minutes: int = 0) -> str:
@@ -46,37 +77,33 @@ def auto_backups(ctx: CLIContext, every: str):
     logger.addHandler(fh)
     logger.info(f'Starting backup process (time interval: {every})')
     logger.info(get_next_planned_backup_communicate(wait_hours=every_hours))
-    hours_conter: int = every_hours
+    stop_request = _StopRequest()
     backup_failed: bool = False
-    while True:
-        if hours_conter == every_hours:
-            try:
-                print('Starting backup...')
-                error: Exception = manager.backup()
-                logger.info(click.style(
-                    'Successfully performed backup', fg='green'))
-                logger.info(get_next_planned_backup_communicate(
-                    wait_hours=every_hours))
-                
-                if error is None:
-                    backup_failed = False
-                else:
-                    backup_failed = True
-                    raise error
-            except Exception as error:
-                logger.error(error)
-                logger.error(
-                    click.style(
-                        f'Failed to perform backup - retry in {RETRY_IN_MINUTES} minutes', fg='red')
-                )
-                logger.info(get_next_planned_backup_communicate(
-                    wait_minutes=RETRY_IN_MINUTES))
-                backup_failed = True
-            if backup_failed:
-                time.sleep(RETRY_IN_MINUTES * 60)
-                continue
+    while not stop_request.requested:
+        try:
+            print('Starting backup...')
+            error: Exception = manager.backup()
+            logger.info(click.style(
+                'Successfully performed backup', fg='green'))
+            logger.info(get_next_planned_backup_communicate(
+                wait_hours=every_hours))
+            
+            if error is None:
+                backup_failed = False
             else:
-                hours_conter = 0
+                backup_failed = True
+                raise error
+        except Exception as error:
+            logger.error(error)
+            logger.error(
+                click.style(
+                    f'Failed to perform backup - retry in {RETRY_IN_MINUTES} minutes', fg='red')
+            )
+            logger.info(get_next_planned_backup_communicate(
+                wait_minutes=RETRY_IN_MINUTES))
+            backup_failed = True
+        if backup_failed:
+            stop_request.wait(timeout=RETRY_IN_MINUTES * 60)
         else:
-            time.sleep(HOUR_TO_SECONDS)
-            hours_conter += 1
+            stop_request.wait(timeout=every_hours * HOUR_TO_SECONDS)
+    logger.info('Backup process stopped')
@@ -13,5 +13,9 @@ setup(
         'pycryptodome>=3.9.6,<4.0.0',
         'pathlib==1.0.1',
         'tenacity>=5.1.5,<6.0.0',
+        'zstandard>=0.15.0',
     ],
+    extras_require={
+        'speedups': ['orjson>=3.6', 'blake3>=0.3', 'libarchive-c>=4.0'],
+    },
 )